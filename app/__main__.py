@@ -2,13 +2,22 @@
 Main module for the MTAA application.
 """
 
+import atexit
+import logging
+import logging.handlers
+import queue
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from app.router import router
 
-app = FastAPI(title="MTAA")
-app.include_router(router)
+# Handlers run in the listener thread, so writing of the log records
+# does not block the event loop.
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(handlers=[logging.handlers.QueueHandler(log_queue)])
+log_listener.start()
+atexit.register(log_listener.stop)
 
-# from app.config.config import config
-# import asyncio
-# from hypercorn.asyncio import serve
-# asyncio.run(serve(app, config))
+app = FastAPI(title="MTAA", default_response_class=ORJSONResponse)
+app.include_router(router)
@@ -2,7 +2,10 @@
 This file is focused on user's input to validates it.
 """
 
-import re
+import string
+
+email_local_characters = frozenset(string.ascii_letters + string.digits + "._%+-")
+email_domain_characters = frozenset(string.ascii_letters + string.digits + ".-")
 
 
 class CreateUser:
@@ -18,13 +21,20 @@ class CreateUser:
     email: str
     password: str
 
-    def validate_input(self, **kwargs) -> bool:
+    @staticmethod
+    def validate_input(username: str, email: str, password: str, confirm_password: str) -> bool:
         """
         Checks user's input length.
 
         Args:
-          kwargs:
-            Represents keywords arguments.
+          username:
+            User's input of username.
+          email:
+            User's input of email.
+          password:
+            User's input of password.
+          confirm_password:
+            User's input of confirm_password.
 
         Returns:
           A boolean value (True or False).
@@ -34,43 +44,57 @@ class CreateUser:
 
           Returned response is always boolean.
         """
-        return True if self.check_length_input(**kwargs) else False
+        return bool(CreateUser.check_length_input(username, email, password, confirm_password))
 
-    def check_length_input(self, **kwargs) -> bool:
+    @staticmethod
+    def check_length_input(username: str, email: str, password: str, confirm_password: str) -> bool:
         """
         Checks user's input length, if they meet database requirements.
 
         Args:
-         kwargs:
-           Represents keywords arguments of user's input.
+         username:
+           User's input of username.
+         email:
+           User's input of email.
+         password:
+           User's input of password.
+         confirm_password:
+           User's input of confirm_password.
 
         Returns:
          A boolean value (True or False).
 
-         If the kwargs arguments are all true, then return True.
+         If the arguments are all at most 255 characters long, then return True.
          Else return False.
 
          Returned response is always boolean.
         """
-        return len(kwargs['username']) <= 255 and len(kwargs['email']) <= 255 and len(kwargs['password']) <= 255 and len(kwargs['confirm_password']) <= 255
+        return max(len(username), len(email), len(password), len(confirm_password)) <= 255
 
-    def validate_email(self, **kwargs) -> bool:
+    @staticmethod
+    def validate_email(email: str) -> bool:
         """
         Checks if the email looks as email. If the input meets requirements for email.
 
         Args:
-         kwargs:
-           Represents keywords arguments of user's input.
-           Should be an email.
+         email:
+           User's input of email.
 
         Returns:
          A boolean value (True or False).
 
-         By using re library it will check regex with value and decide
-         if it is true or not.
+         The email is split by '@' and the last '.' of the domain, then each part
+         is checked against the allowed characters in a single pass, without
+         any regex. Emails longer than the database limit are refused.
 
          Returned response is always boolean.
         """
-        regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b'
-        return bool(re.fullmatch(regex, kwargs['email']))
+        if len(email) > 255:
+            return False
+        local, _, domain = email.partition('@')
+        host, _, top_level_domain = domain.rpartition('.')
+        return (bool(local) and bool(host) and 2 <= len(top_level_domain) <= 7
+                and top_level_domain.isascii() and top_level_domain.isalpha()
+                and email_local_characters.issuperset(local)
+                and email_domain_characters.issuperset(host))
 
@@ -2,18 +2,60 @@
 This file is focused on password security and jwt token generalization.
 """
 
+import hmac
 import os
-from hashlib import pbkdf2_hmac
+import threading
+import time
+from functools import lru_cache
+from hashlib import pbkdf2_hmac, blake2b
 import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from cachetools import TTLCache
 from app.config.config import settings
 
+password_hasher = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2)
+# Each Argon2 hash takes 64 MiB of memory, so at most one hash per CPU core is computed
+# at once, the other threads of the threadpool wait instead of allocating more memory.
+argon2_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+decoded_tokens = TTLCache(maxsize=4096, ttl=30)
+# The secret key is encoded to bytes only once, not on every signature.
+jwt_secret_key = settings.JWT_SECRET_KEY.encode("utf-8")
+# Only the signature and expiration are verified, the tokens issued
+# by this app do not carry any of the other registered claims.
+jwt_decode_options = {
+    "verify_signature": True,
+    "verify_exp": True,
+    "verify_nbf": False,
+    "verify_iat": False,
+    "verify_aud": False,
+    "verify_iss": False,
+}
+
+
+@lru_cache(maxsize=1024)
+def encode_token_content(content: tuple) -> str:
+    """
+    Encode the content into a JWT token.
+
+    The signature is deterministic for the same content and secret key, so the
+    token is signed only once per content and reused afterwards.
+
+    Args:
+        content: The content of the token as a tuple of (key, value) pairs.
+
+    Returns:
+        string: The encoded JWT token.
+    """
+    return jwt.encode(dict(content), jwt_secret_key, algorithm=settings.ALGORITHM)
+
 
 class Tokenization():
     """
     Tokenization class for handling token-related operations.
 
-    This class provides methods for password salting, password hashing,
-    and JWT token generalization.
+    This class provides methods for password hashing, password verification,
+    JWT token generalization and verification.
 
     Attributes:
         access_token: The access token string.
@@ -22,39 +64,90 @@ class Tokenization():
     access_token: str
     token_type: str
 
-    # https://medium.com/@karthikeyan.ranasthala/build-a-jwt-based-authentication-rest-api-with-flask-and-mysql-5dc6d3d1cb82
-    def password_salting(self) -> str:
+    @staticmethod
+    def password_hashing(original_pass: str) -> str:
+        """
+        Generate a hashed password using Argon2id.
+
+        The random salt is generated by argon2 and stored inside of the returned hash,
+        so it does not need to be kept separately.
+
+        Args:
+            original_pass: The original password from user's input.
+
+        Returns:
+            string: The hashed password in argon2 encoded format.
+        """
+        with argon2_slots:
+            return password_hasher.hash(original_pass)
+
+    @staticmethod
+    def password_verification(hashed_pass: str, original_pass: str, salty_pass: str) -> bool:
+        """
+        Verify the password from user's input against the stored hash.
+
+        Hashes created before Argon2 was introduced are PBKDF2-HMAC hashes with
+        a separate salt, they are still accepted.
+
+        Args:
+            hashed_pass: The hashed password stored in the database.
+            original_pass: The original password from user's input.
+            salty_pass: The salt stored in the database, used only by PBKDF2 hashes.
+
+        Returns:
+            boolean: True if the password matches the hash, else False.
+        """
+        if hashed_pass.startswith("$argon2"):
+            try:
+                with argon2_slots:
+                    return password_hasher.verify(hashed_pass, original_pass)
+            except (VerificationError, InvalidHashError):
+                return False
+        # Constant-time comparison, so the response time does not reveal
+        # how many leading characters of the hash matched.
+        return hmac.compare_digest(Tokenization.legacy_password_hashing(original_pass, salty_pass), hashed_pass)
+
+    @staticmethod
+    def password_needs_rehash(hashed_pass: str) -> bool:
         """
-        Generate a random salt for password salting.
+        Check if the stored hash should be replaced by a new one.
+
+        The legacy PBKDF2 hashes and Argon2 hashes created with other parameters
+        than the current ones are rehashed after the next successful login.
+
+        Args:
+            hashed_pass: The hashed password stored in the database.
 
         Returns:
-            string: The generated salt in hexadecimal format.
+            boolean: True if the password should be hashed again, else False.
         """
-        salt = os.urandom(16)
-        return salt.hex()
+        if hashed_pass.startswith("$argon2"):
+            return password_hasher.check_needs_rehash(hashed_pass)
+        return True
 
-    def password_hashing(self, original_pass: str, salty_pass: str) -> str:
+    # https://medium.com/@karthikeyan.ranasthala/build-a-jwt-based-authentication-rest-api-with-flask-and-mysql-5dc6d3d1cb82
+    @staticmethod
+    def legacy_password_hashing(original_pass: str, salty_pass: str) -> str:
         """
-        Generate a hashed password using PBKDF2-HMAC.
+        Generate a hashed password using PBKDF2-HMAC, as it was stored before Argon2.
 
         Args:
             original_pass: The original password from user's input.
-            salty_pass: The salted password generated from password_salting function.
+            salty_pass: The salt stored next to the hashed password.
 
         Returns:
             string: The hashed password in hexadecimal format.
         """
         hashed_pass = pbkdf2_hmac(
             "sha256",
-                b"%b" % bytes(original_pass, "utf-8"),
-                b"%b" % bytes(salty_pass, "utf-8"),
+            original_pass.encode("utf-8"),
+            salty_pass.encode("utf-8"),
             10000,
         )
         return hashed_pass.hex()
 
-    #
-
-    def jwt_token_generalization(self, content: dict) -> str:
+    @staticmethod
+    def jwt_token_generalization(content: dict) -> str:
         """
         Generate a JWT token with the provided content.
         The content representing JSON object, in this case user id.
@@ -65,9 +158,34 @@ class Tokenization():
         Returns:
             string: The encoded JWT token.
         """
-        encoded_content = jwt.encode(content, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
-        return encoded_content
+        return encode_token_content(tuple(sorted(content.items())))
+
+    @staticmethod
+    def jwt_token_verification(token: str) -> dict:
+        """
+        Verify a JWT token and decode its content.
 
+        Decoded content is cached for 30 seconds under the blake2b digest of the token,
+        so the repeated requests with the same token skip the signature check.
+        Invalid tokens are never cached, the ones which cannot be a JWT token at all
+        (not three dot separated parts or unreasonable length) are rejected right away.
 
+        Args:
+            token: The encoded JWT token.
 
+        Returns:
+            dict: The decoded content of the token.
 
+        Raises:
+            jwt.ExpiredSignatureError: The token is expired.
+            jwt.InvalidTokenError: The token is invalid.
+        """
+        if token.count(".") != 2 or not 20 < len(token) < 8192:
+            raise jwt.DecodeError("Malformed token")
+        key = blake2b(token.encode("utf-8"), digest_size=16).digest()
+        decoded_token = decoded_tokens.get(key)
+        if decoded_token is None or decoded_token.get("exp", float("inf")) <= time.time():
+            decoded_token = jwt.decode(token, jwt_secret_key, algorithms=[settings.ALGORITHM],
+                                       options=jwt_decode_options)
+            decoded_tokens[key] = decoded_token
+        return decoded_token
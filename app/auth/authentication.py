@@ -13,59 +13,336 @@ A brief overview of exported classes and their usage:
 
     security = HTTPBearer()
         in the authorization requests of user, example:
-            async def edit_profile(request: Request, credentials: HTTPAuthorizationCredentials
+            async def edit_profile(body: EditProfileInput, credentials: HTTPAuthorizationCredentials
                 = Depends(security)):
 
-    new_user = CreateUser()
+    CreateUser
         for the functions that validate inputs of user, example:
-             new_user.validate_input(username=username, email=email, password=password,
-                confirm_password=confirm_password) and new_user.validate_email(email=email)
+             CreateUser.validate_input(username, email, password, confirm_password)
+                and CreateUser.validate_email(email)
 
-    secure_password = Tokenization()
+    Tokenization
         for generating tokens and hashing user's password, example:
-            salty_password = secure_password.password_salting()
+            hashed_password = Tokenization.password_hashing(password)
 
     for handling database connection:
-        pool = psycopg2.pool.SimpleConnectionPool(
-                        minconn=1,
-                        maxconn=10,
+        pool = BlockingConnectionPool(
+                        minconn=settings.DB_POOL_MIN,
+                        maxconn=settings.DB_POOL_MAX,
                         dbname=settings.DATABASE_NAME_SERVER,
                         host=settings.DATABASE_HOST,
                         port=settings.DATABASE_PORT,
                         user=settings.DATABASE_USER,
-                        password=settings.DATABASE_PASSWORD
+                        password=settings.DATABASE_PASSWORD,
+                        keepalives=1,
+                        keepalives_idle=30,
+                        keepalives_interval=10,
+                        keepalives_count=5
                     )
 """
 
+import hashlib
+import json
+import logging
 import re
-import uuid
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
 
 import jwt
-from fastapi import APIRouter, Request, HTTPException, Depends
+from cachetools import TTLCache
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+import psycopg2.errors
 import psycopg2.pool
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+from pydantic import BaseModel
 from app.auth.CreateUser import CreateUser
 from app.auth.Tokenization import Tokenization
 from app.config.config import settings
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 security = HTTPBearer()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth")
 
-pool = psycopg2.pool.SimpleConnectionPool(
-    minconn=1,
-    maxconn=10,
+
+class SignupInput(BaseModel):
+    """
+    Body of the signup request.
+
+    The fields are optional, so the missing ones are reported
+    by the endpoint as "All fields are required.".
+    """
+    username: Optional[str] = None
+    email: Optional[str] = None
+    password: Optional[str] = None
+    confirm_password: Optional[str] = None
+
+
+class LoginInput(BaseModel):
+    """
+    Body of the login request.
+    """
+    username: Optional[str] = None
+    password: Optional[str] = None
+
+
+class ForgottenPasswordInput(BaseModel):
+    """
+    Body of the forgotten password request.
+    """
+    email: Optional[str] = None
+    password: Optional[str] = None
+    confirm_password: Optional[str] = None
+
+
+class EditProfileInput(BaseModel):
+    """
+    Body of the edit profile request, only the changed fields are sent.
+    """
+    username: Optional[str] = None
+    email: Optional[str] = None
+    password: Optional[str] = None
+    confirm_password: Optional[str] = None
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    Thread-safe connection pool which waits for a free connection.
+
+    ThreadedConnectionPool raises PoolError right away when all of its connections
+    are borrowed. The threadpool of the endpoints runs more threads than the pool has
+    connections, so this pool blocks the thread until a connection is returned
+    (at most DB_POOL_TIMEOUT seconds) and a burst of requests is queued instead of failing.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self._free_slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        """
+        Borrows the connection, waits when all connections are borrowed.
+
+        Raises:
+          psycopg2.pool.PoolError: No connection was returned within DB_POOL_TIMEOUT seconds.
+        """
+        if not self._free_slots.acquire(timeout=settings.DB_POOL_TIMEOUT):
+            raise psycopg2.pool.PoolError("connection pool exhausted")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._free_slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        """
+        Returns the connection to the pool and wakes up one waiting thread.
+        """
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._free_slots.release()
+
+
+pool = BlockingConnectionPool(
+    minconn=settings.DB_POOL_MIN,
+    maxconn=settings.DB_POOL_MAX,
     dbname=settings.DATABASE_NAME_SERVER,
     host=settings.DATABASE_HOST,
     port=settings.DATABASE_PORT,
     user=settings.DATABASE_USER,
-    password=settings.DATABASE_PASSWORD
+    password=settings.DATABASE_PASSWORD,
+    keepalives=1,
+    keepalives_idle=30,
+    keepalives_interval=10,
+    keepalives_count=5
 )
+# Ids of users confirmed in the database by token_access, a deleted user
+# is removed by delete_account, the other workers forget him in 30 seconds.
+existing_users = TTLCache(maxsize=10000, ttl=30)
+# Profile field edited by the request according to which of username, email,
+# password and confirm_password are filled in, only one field can be changed at once.
+edited_fields = {
+    (True, False, False, False): "username",
+    (False, True, False, False): "email",
+    (False, False, True, True): "password",
+}
+# Names of the statements already prepared on each pooled connection.
+prepared_statements = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def get_conn(db_pool: BlockingConnectionPool = pool):
+    """
+    Borrows the connection from the pool and always returns it back,
+    also when the query raises an exception. The failed transaction is rolled back.
+
+    The endpoints of the client database use it with their own pool as well.
+
+    Args:
+      db_pool:
+        The pool to borrow from, the pool of the server database by default.
+
+    Yields:
+      The pooled database connection.
+    """
+    conn = db_pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
+@lru_cache(maxsize=None)
+def prepare_statement(query: str) -> tuple:
+    """
+    Translates the query with %s placeholders into the PREPARE statement.
+
+    The name of the statement is derived from the query text, so the same query
+    always gets the same name on every connection.
+
+    Args:
+      query:
+        SQL query with %s placeholders.
+
+    Returns:
+      A tuple of the statement name, PREPARE statement and EXECUTE statement
+      with %s placeholders for the parameters.
+    """
+    name = "stmt_" + hashlib.md5(query.encode("utf-8")).hexdigest()[:16]
+    parts = query.split("%s")
+    numbered = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+    execute = f"EXECUTE {name}"
+    if len(parts) > 1:
+        execute += f"({', '.join(['%s'] * (len(parts) - 1))})"
+    return name, f"PREPARE {name} AS {numbered}", execute
+
+
+def execute_prepared(cursor, query: str, params: tuple):
+    """
+    Executes the query as a server-side prepared statement.
+
+    The statement is prepared only once per database connection, the next
+    calls send only EXECUTE with parameters, so the query is not parsed
+    and planned again on every request.
+
+    With DB_PREPARED_STATEMENTS disabled the query is executed directly,
+    PgBouncer in the transaction pooling mode can give every transaction
+    other server connection, so the statements prepared before are not there.
+
+    Args:
+      cursor:
+        The cursor of the pooled database connection.
+      query:
+        SQL query with %s placeholders.
+      params:
+        Parameters of the query.
+    """
+    if not settings.DB_PREPARED_STATEMENTS:
+        cursor.execute(query, params)
+        return
+    name, prepare, execute = prepare_statement(query)
+    names = prepared_statements.setdefault(cursor.connection, set())
+    if name not in names:
+        cursor.execute(prepare)
+        names.add(name)
+    cursor.execute(execute, params)
+
+
+@lru_cache(maxsize=None)
+def encoded_detail(key: str, message: str) -> bytes:
+    """
+    Serializes the constant JSON body of the response only once.
+
+    Args:
+      key:
+        Key of the JSON object, usually "detail".
+      message:
+        Message of the response.
+
+    Returns:
+      The JSON object encoded as bytes, the same as JSONResponse renders it.
+    """
+    return json.dumps({key: message}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def detail_response(status_code: int, message: str, key: str = "detail") -> Response:
+    """
+    Creates the JSON response with the constant message, without serializing it on every request.
+
+    Args:
+      status_code:
+        HTTP/HTTPS status code of the response.
+      message:
+        Message of the response.
+      key:
+        Key of the JSON object, "detail" by default.
+
+    Returns:
+      A Response with JSON content {key: message}.
+    """
+    return Response(content=encoded_detail(key, message), status_code=status_code, media_type="application/json")
+
+
+def execute_and_commit(query: str, params: tuple) -> int:
+    """
+    Executes the modifying SQL query on the pooled connection and commits it.
+
+    The function is blocking, so the async endpoints run it in the threadpool
+    and the event loop is not stalled by the database.
+
+    Args:
+      query:
+        SQL query with %s placeholders.
+      params:
+        Parameters of the query.
+
+    Returns:
+      The number of rows affected by the query.
+    """
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        execute_prepared(cursor, query, params)
+        conn.commit()
+        cursor.close()
+    return cursor.rowcount
+
+
+def fetch_one_and_commit(query: str, params: tuple):
+    """
+    Executes the modifying SQL query with RETURNING clause on the pooled connection,
+    commits it and returns the first returned row.
+
+    The function is blocking, so the async endpoints run it in the threadpool.
+
+    Args:
+      query:
+        SQL query with %s placeholders and RETURNING clause.
+      params:
+        Parameters of the query.
+
+    Returns:
+      The first returned row or None if the query did not change any row.
+    """
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        execute_prepared(cursor, query, params)
+        record = cursor.fetchone()
+        conn.commit()
+        cursor.close()
+    return record
 
 
 @router.post("/api/signup/")
-async def signup(request: Request) -> JSONResponse:
+async def signup(body: SignupInput) -> Response:
     """
     Registers user and handles his data.
 
@@ -73,8 +350,8 @@ async def signup(request: Request) -> JSONResponse:
     then validate them and put into database.
 
     Args:
-       request:
-        Body of the post request. Request instance of the FastAPI.
+       body:
+        Body of the request parsed by FastAPI into the SignupInput model.
 
     Returns:
        A JSONResponse of the HTTP/HTTPS status code of the request with
@@ -113,35 +390,35 @@ async def signup(request: Request) -> JSONResponse:
             a general exception. Exception instance with status code 500.
     """
     try:
-        input = await request.json()
-        username = input.get("username")
-        email = input.get("email")
-        password = input.get("password")
-        confirm_password = input.get("confirm_password")
+        username = body.username
+        email = body.email
+        password = body.password
+        confirm_password = body.confirm_password
 
         if not (username and email and password and confirm_password):
-            return JSONResponse(status_code=400, content={"detail": "Bad request: All fields are required."})
-
-        is_email = await email_exists(email)
-        if not is_email:
-            salty_password, hashed_password = await generate_hashed_password(username, email, password, confirm_password)
-
-            if salty_password is None and hashed_password is None:
-                return JSONResponse(status_code=403, content={"detail": "Forbidden: Access forbidden."})
-
-            generated_uuid = uuid.uuid4()
-            conn = pool.getconn()
-            cursor = conn.cursor()
-            query = ("""INSERT INTO users_auth
-                        VALUES (%s, %s, %s, %s, %s)""")
-            cursor.execute(query, (str(generated_uuid), username, email, salty_password, hashed_password))
-            conn.commit()
-            cursor.close()
-            pool.putconn(conn)
-            return JSONResponse(status_code=201, content={"detail": "Created: User created successfully"})
-        return JSONResponse(status_code=400, content={"detail": "Bad request: Email already exists."})
+            return detail_response(400, "Bad request: All fields are required.")
+
+        hashed_password = await generate_hashed_password(username, email, password, confirm_password)
+
+        if hashed_password is None:
+            return detail_response(403, "Forbidden: Access forbidden.")
+
+        # The unique index users_auth_email_idx (migrations/001_users_auth_indexes.sql) decides
+        # about the duplicate email, also when two signups with the same email run concurrently,
+        # the second one inserts no row.
+        # The id of the user is generated by Postgres.
+        query = ("""INSERT INTO users_auth (id, username, email, password_salt, password_hash)
+                    VALUES (gen_random_uuid(), %s, %s, %s, %s)
+                    ON CONFLICT (email) DO NOTHING
+                    RETURNING id""")
+        # Argon2 keeps the salt inside of the hash, the password_salt column stays empty.
+        record = await run_in_threadpool(fetch_one_and_commit, query,
+                                         (username, email, "", hashed_password))
+        if record is None:
+            return detail_response(400, "Bad request: Email already exists.")
+        return detail_response(201, "Created: User created successfully")
     except psycopg2.Error as e:
-        print(f"Error executing SQL query: {e}")
+        logger.exception("Error executing SQL query: %s", e)
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
@@ -165,16 +442,15 @@ async def generate_hashed_password(username: str, email: str, password: str, con
         User's input of confirm_password.
 
     Returns:
-       A tuple of salty_password and hashed_password or if not successful then None and None.
+       A hashed_password or if not successful then None.
        For example:
             user password is: "125"
 
-            the salty_password is: "c188d9111ecd9c8310c4775afdb2f166"
-            the hashed_password is: "bb1ca6e6c5ce37d2020c62097d43734baa6ea3f0d99b978b624b9c98fea23d25"
+            the hashed_password is: "$argon2id$v=19$m=65536,t=3,p=2$2r+Q5ast/kYHIDNiAV8BIw$ZQd/sfNPQvfe+jckJ48nhv508fo9QtLGUOMDXYXvyqQ"
 
 
-       Returned response is always tuple. The salty password is important due to security of
-       the user's data.
+       Returned response is string or None. The hash contains its own random salt due to
+       security of the user's data.
 
     Raises:
        HTTPException: An error occurred, Internal server error. Its is
@@ -182,11 +458,8 @@ async def generate_hashed_password(username: str, email: str, password: str, con
     """
     try:
         if check_signup_input(username, email, password, confirm_password):
-            secure_password = Tokenization()
-            salty_password = secure_password.password_salting()
-            hashed_password = secure_password.password_hashing(password, salty_password)
-            return salty_password, hashed_password
-        return (None, None)
+            return await run_in_threadpool(Tokenization.password_hashing, password)
+        return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
@@ -215,80 +488,20 @@ def check_signup_input(username:str, email:str, password: str, confirm_password:
 
       Returned response is always boolean.
     """
-    new_user = CreateUser()
-    return check_passwords_equality(password, confirm_password) and new_user.validate_input(username=username, email=email, password=password,
-                                                                confirm_password=confirm_password) and new_user.validate_email(email=email)
-
-
-def check_passwords_equality(password: str, confirm_password: str) -> bool:
-    """
-    Checks passwords equality between argument password and confirm_password.
-    They should be the same.
+    return password == confirm_password and CreateUser.validate_input(username, email, password,
+                                                                      confirm_password) and CreateUser.validate_email(email)
 
-    Retrieves user's input data of password and confirmation password.
-
-    Args:
-      password:
-       User's input of password.
-      confirm_password:
-       User's input of confirm_password.
-
-    Returns:
-      A boolean value (True or False).
-
-      If the passwords are equal then True. If not then False.
-
-      Returned response is always boolean.
-    """
-    return password == confirm_password
-
-
-async def email_exists(email: str) -> bool:
-    """
-    Checking if the email is already in the database.
-
-    Retrieves user's input data of an email and searching
-    email in the database by SQL query.
-
-    Args:
-       email:
-        User's input of email.
-
-    Returns:
-       A boolean value (True or False).
-
-       If the email is not in the database then False. If does exist then True.
-
-       Returned response is always boolean.
-
-    Raises:
-       HTTPException: An error occurred, Internal server error. Its is
-            a general exception. Exception instance with status code 500.
-    """
-    try:
-        conn = pool.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT EXISTS(SELECT 1 FROM users_auth WHERE email=%s)""")
-        cursor.execute(query, (email, ))
-        result = cursor.fetchone()[0]
-        cursor.close()
-        pool.putconn(conn)
-        if result == 0:
-            return False
-        return True
-    except Exception as e:
-        raise HTTPException(status_code=500, detail={f"Internal server error: {e}"})
 
 @router.post("/api/login/")
-async def login(request: Request):
+async def login(body: LoginInput):
     """
     Logins user into the system and generates jwt bearer token for authorization.
 
     Retrieves user's input data as username and password to login into system.
 
     Args:
-       request:
-        Body of the post request. Request instance of the FastAPI.
+       body:
+        Body of the request parsed by FastAPI into the LoginInput model.
 
     Returns:
        A JSONResponse of the HTTP/HTTPS status code of the request with
@@ -319,23 +532,22 @@ async def login(request: Request):
         a general exception. Exception instance with status code 500.
     """
     try:
-        user_input = await request.json()
-        username = user_input.get("username")
-        password = user_input.get("password")
+        username = body.username
+        password = body.password
         if not username or not password:
-            return JSONResponse(status_code=400, content={"detail": "Bad request"})
+            return detail_response(400, "Bad request")
 
-        user_token = await get_user(username, password)
+        user_token = await run_in_threadpool(get_user, username, password)
 
         if user_token and user_token is not False:
             return {"jwt_token": user_token}
 
-        return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
+        return detail_response(401, "Unauthorized")
     except Exception as e:
         raise HTTPException(status_code=500, detail={f"Internal server error: {e}"})
 
 
-async def get_user(username: str, password: str):
+def get_user(username: str, password: str):
     """
     Function from the login process to find user in the system
     according to his name and password by SQL query.
@@ -358,26 +570,39 @@ async def get_user(username: str, password: str):
 
     Returned response is a boolean value or generate jwt token
     as a response to the login function.
+
+    The hash of the user is replaced after successful login, if it was created
+    by PBKDF2 or with other Argon2 parameters than the current ones.
+
+    The function is blocking (SQL query and password verification),
+    so the login function runs it in the threadpool.
     """
-    conn = pool.getconn()
-    cursor = conn.cursor()
-    query = ("""SELECT *
-                   FROM users_auth
-                   WHERE username= %s""")
-    cursor.execute(query, (username,))
-    record = cursor.fetchone()
-    cursor.close()
-    pool.putconn(conn)
-
-    if record is not None and len(record) == 5:
-        hashed_password = record[4]
-        salty_password = record[3]
-        get_password = Tokenization()
-        new_hashed_password = get_password.password_hashing(password, salty_password)
-
-        if check_passwords_equality(hashed_password, new_hashed_password):
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        query = ("""SELECT id, password_salt, password_hash
+                       FROM users_auth
+                       WHERE username= %s
+                       LIMIT 1""")
+        execute_prepared(cursor, query, (username,))
+        record = cursor.fetchone()
+        cursor.close()
+
+    if record is not None:
+        hashed_password = record[2]
+        salty_password = record[1]
+        if Tokenization.password_verification(hashed_password, password, salty_password):
             user_id = record[0]
-            jwt_token = get_password.jwt_token_generalization({"id": user_id})
+            if Tokenization.password_needs_rehash(hashed_password):
+                query = ("""UPDATE users_auth
+                              SET password_salt = %s, password_hash = %s
+                              WHERE id = %s""")
+                # The password is already verified, the login does not fail if only
+                # the new hash cannot be stored, it is stored after the next login.
+                try:
+                    execute_and_commit(query, ("", Tokenization.password_hashing(password), user_id))
+                except psycopg2.Error as e:
+                    logger.exception("Error storing the rehashed password: %s", e)
+            jwt_token = Tokenization.jwt_token_generalization({"id": user_id})
             return jwt_token
         else:
             return False
@@ -386,7 +611,7 @@ async def get_user(username: str, password: str):
 
 
 @router.put("/api/forgotten-password/")
-async def forgotten_password(request: Request) -> JSONResponse:
+async def forgotten_password(body: ForgottenPasswordInput) -> Response:
     """
     If the user forgotten password, this function can change/update his password
     and generate new hashed password.
@@ -394,8 +619,8 @@ async def forgotten_password(request: Request) -> JSONResponse:
     Retrieves user's input data as email, password, confirm_password into system.
 
     Args:
-       request:
-        Body of the post request. Request instance of the FastAPI.
+       body:
+        Body of the request parsed by FastAPI into the ForgottenPasswordInput model.
 
    Returns:
        A JSONResponse of the HTTP/HTTPS status code of the request with
@@ -428,38 +653,34 @@ async def forgotten_password(request: Request) -> JSONResponse:
             a general exception. Exception instance with status code 500.
     """
     try:
-        input = await request.json()
-        email = input.get("email")
-        password = input.get("password")
-        confirm_password = input.get("confirm_password")
+        email = body.email
+        password = body.password
+        confirm_password = body.confirm_password
 
         if not (email and password and confirm_password):
-            return JSONResponse(status_code=400, content={"detail": "Bad request: All fields are required."})
+            return detail_response(400, "Bad request: All fields are required.")
 
-        is_email = await email_exists(email)
-        if not is_email:
-            return JSONResponse(status_code=403, content={"detail": "Forbidden: Access forbidden."})
+        hashed_password = await generate_new_hashed_password(password, confirm_password)
+        if hashed_password is None:
+            return detail_response(403, "Forbidden: Access forbidden.")
 
-        salty_password, hashed_password = await generate_new_hashed_password(password, confirm_password)
-
-        conn = pool.getconn()
-        cursor = conn.cursor()
+        # Nothing is returned if the email is not in the database.
         query = ("""UPDATE users_auth
                       SET password_salt = %s, password_hash = %s
-                      WHERE email = %s """)
-        cursor.execute(query, (salty_password, hashed_password, email))
-        conn.commit()
-        cursor.close()
-        pool.putconn(conn)
-        return JSONResponse(status_code=200, content={"detail": "OK: Password updated successfully"})
+                      WHERE email = %s
+                      RETURNING id""")
+        record = await run_in_threadpool(fetch_one_and_commit, query, ("", hashed_password, email))
+        if record is None:
+            return detail_response(403, "Forbidden: Access forbidden.")
+        return detail_response(200, "OK: Password updated successfully")
     except psycopg2.Error as e:
-        print(f"Error executing SQL query: {e}")
+        logger.exception("Error executing SQL query: %s", e)
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
-async def generate_new_hashed_password(password: str, confirm_password: str) -> (str, str):
+async def generate_new_hashed_password(password: str, confirm_password: str):
     """
     Generates new hashed password after signup or forgotten password.
 
@@ -472,35 +693,32 @@ async def generate_new_hashed_password(password: str, confirm_password: str) ->
         User's input of confirm_password.
 
     Returns:
-      Tuple of salty_password and hashed_password or unsuccessful status.
+      The hashed_password or None if the passwords are not equal.
       For example:
 
       If successful:
-        (4ab5a6eeb8c11c58158b5b91880f6bd3, ff17345a32fe7cdfe1b47b8ac37c4979cc5f6e9a0487448c082b5a83d4164fa0)
+        $argon2id$v=19$m=65536,t=3,p=2$FfqVdTaBUckrgi+M5/vT7Q$5orKIrRbP9ueKP/tnUmcKF9nZl0iWwhz5n6Zud63UBM
       else:
-        "status": "Passwords are not equal." error 500
+        None
 
 
-    Returned response is tuple or JSON object
+    Returned response is string or None
 
     Raises:
       HTTPException: An error occurred, Internal server error. Its is
            a general exception. Exception instance with status code 500.
     """
     try:
-        if check_passwords_equality(password, confirm_password):
-            secure_password = Tokenization()
-            salty_password = secure_password.password_salting()
-            hashed_password = secure_password.password_hashing(password, salty_password)
-            return salty_password, hashed_password
+        if password == confirm_password:
+            return await run_in_threadpool(Tokenization.password_hashing, password)
         else:
-            return {"status": "Passwords are not equal."}
+            return None
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.patch("/api/edit_profile/")
-async def edit_profile(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def edit_profile(body: EditProfileInput, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Edits profile of user, by updating his data from the user input.
     Always can be change only one data at once of user.
@@ -509,8 +727,8 @@ async def edit_profile(request: Request, credentials: HTTPAuthorizationCredentia
     then validate them and update in database.
 
     Args:
-       request:
-        Body of the post request. Request instance of the FastAPI.
+       body:
+        Body of the request parsed by FastAPI into the EditProfileInput model.
        credentials:
         Bearer token to authorize. HTTPAuthorizationCredentials instance
         with security instance of HTTPBearer.
@@ -554,215 +772,68 @@ async def edit_profile(request: Request, credentials: HTTPAuthorizationCredentia
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return detail_response(404, "User not found.", key="Not Found")
 
-        input = await request.json()
         id = token_access_value
-        username = input.get("username")
-        email = input.get("email")
-        password = input.get("password")
-        confirm_password = input.get("confirm_password")
+        username = body.username
+        email = body.email
+        password = body.password
+        confirm_password = body.confirm_password
 
         if not (username or email or password or confirm_password):
             return {"status": "No changes were made."}
 
-        if edit_only_username_or_email(username, email, password, confirm_password):
-            is_changed = await edit_username(username, id)
+        edited_field = edited_fields.get((bool(username), bool(email), bool(password), bool(confirm_password)))
+        if edited_field == "username":
+            is_changed = await run_in_threadpool(update_profile, id, username=username)
             if is_changed:
-                return JSONResponse(status_code=200, content={"detail": "OK: Username updated successfully."})
-            return JSONResponse(status_code=500, content={"detail": "Username is not updated, check id."})
-        elif edit_only_username_or_email(email, username, password, confirm_password):
-            is_changed = await edit_email(email, id)
+                return detail_response(200, "OK: Username updated successfully.")
+            return detail_response(500, "Username is not updated, check id.")
+        elif edited_field == "email":
+            is_changed = (CreateUser.validate_email(email)
+                          and await run_in_threadpool(update_profile, id, email=email))
             if is_changed:
-                return JSONResponse(status_code=200, content={"detail": "OK: Email updated successfully."})
-            return JSONResponse(status_code=500, content={"detail": "Email is not updated, check id or email."})
-        elif edit_only_password(password, confirm_password, username, email):
-            is_changed = await edit_password(password, confirm_password, id)
+                return detail_response(200, "OK: Email updated successfully.")
+            return detail_response(500, "Email is not updated, check id or email.")
+        elif edited_field == "password":
+            hashed_password = await generate_new_hashed_password(password, confirm_password)
+            is_changed = (hashed_password is not None
+                          and await run_in_threadpool(update_profile, id, hashed_password=hashed_password))
             if is_changed:
-                return JSONResponse(status_code=200, content={"detail": "OK: Password updated successfully."})
-            return JSONResponse(status_code=500, content={"detail": "Password is not updated, check id."})
+                return detail_response(200, "OK: Password updated successfully.")
+            return detail_response(500, "Password is not updated, check id.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
-def edit_only_username_or_email(attribute_to_change: str, stay_attribute: str, password: str, confirm_password: str) -> bool:
-    """
-    Checks if the user wants to change username or email.
-
-    Args:
-      attribute_to_change:
-        User's input of username or email.
-      stay_attribute:
-        User's input of username or email.
-        If is in the attribute_to_change username then in this will be email and vice versa.
-        The wanted value is None.
-      password:
-        User's input of password, the wanted value is None.
-      confirm_password:
-        User's input of confirm_password, the wanted value is None.
-
-    Returns:
-      A boolean value (True or False).
-
-      If the attribute_to_change is True an others are False, then return True.
-      Else return False.
-
-      Returned response is always boolean.
-    """
-    return attribute_to_change is not None and not stay_attribute and not password and not confirm_password
-
-
-async def edit_username(username: str, id: str) -> bool:
+def update_profile(id: str, username: str = None, email: str = None, hashed_password: str = None) -> bool:
     """
-    If the user choose to edit username, then this function handles it
-    by SQL query updating database data of user.
+    Updates user's data by one SQL query, the columns with None value stay unchanged.
 
-    Args:
-     username:
-        User's input of username  to change/update.
-     id:
-        Id of user from the token.
-
-    Returns:
-     A boolean value. For example:
-
-     If the username is changed successfully:
-        Then returns True.
-     Else:
-        Returns False.
-
-    Returned response is always boolean.
-
-    Raises:
-     HTTPException: An error occurred in the SQL query or database connection.
-      psycopg2.Error instance with status code 500.
-     HTTPException: An error occurred, Internal server error. Its is
-          a general exception. Exception instance with status code 500.
-    """
-    try:
-        conn = pool.getconn()
-        cursor = conn.cursor()
-        query = ("""UPDATE users_auth
-                    SET username = %s
-                    WHERE id = %s""")
-        cursor.execute(query, (username, id))
-        conn.commit()
-        cursor.close()
-        pool.putconn(conn)
-
-        if cursor.rowcount > 0:
-            return True
-        else:
-            return False
-
-    except psycopg2.Error as e:
-        print(f"Error executing SQL query: {e}")
-        raise HTTPException(status_code=500, detail="Database error")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
-
-
-async def edit_email(email: str, id: str) -> bool:
-    """
-    If the user choose to edit email, then this function handles it
-    by SQL query updating database data of user.
+    The email is updated only if no other user has it already.
 
     Args:
-     email:
-        User's input of email  to change/update.
      id:
         Id of user from the token.
-
-    Returns:
-     A boolean value. For example:
-
-     If the email is changed successfully:
-        Then returns True.
-     Else:
-        Returns False.
-
-    Returned response is always boolean.
-
-    Raises:
-     HTTPException: An error occurred in the SQL query or database connection.
-      psycopg2.Error instance with status code 500.
-     HTTPException: An error occurred, Internal server error. Its is
-          a general exception. Exception instance with status code 500.
-    """
-    try:
-        new_user = CreateUser()
-        is_email = await email_exists(email)
-        if not is_email and new_user.validate_email(email=email):
-            conn = pool.getconn()
-            cursor = conn.cursor()
-            query = ("""UPDATE users_auth
-                        SET email = %s
-                        WHERE id = %s""")
-            cursor.execute(query, (email, id))
-            conn.commit()
-            cursor.close()
-            pool.putconn(conn)
-
-            if cursor.rowcount > 0:
-                return True
-            else:
-                return False
-        return False
-    except psycopg2.Error as e:
-        print(f"Error executing SQL query: {e}")
-        raise HTTPException(status_code=500, detail="Database error")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
-
-
-def edit_only_password(password: str, confirm_password: str, username: str, email: str) -> bool:
-    """
-    Checks if the user wants to change password.
-
-    Args:
-     password:
-       User's input of password.
-     confirm_password:
-       User's input of confirm_password.
      username:
-       User's input of username, the wanted value is None.
+        User's input of username to change/update or None.
      email:
-       User's input of email, the wanted value is None.
-
-    Returns:
-     A boolean value (True or False).
-
-     If the password and confirm_password is True an others are False, then return True.
-     Else return False.
-
-     Returned response is always boolean.
-    """
-    return password is not None and confirm_password is not None and not username and not email
-
-
-async def edit_password(password: str, confirm_password: str, id: str) -> bool:
-    """
-    If the user choose to edit password, then this function handles it
-    by SQL query updating database data of user.
-
-    Args:
-     password:
-        User's input of password to change/update.
-     confirm_password:
-        User's input of confirm_password to check equality with password.
-     id:
-        Id of user from the token.
+        Validated user's input of email to change/update or None.
+     hashed_password:
+        New hashed password to change/update or None.
 
     Returns:
      A boolean value. For example:
 
-     If the password is changed successfully:
+     If the data are changed successfully:
         Then returns True.
      Else:
         Returns False.
 
     Returned response is always boolean.
 
+    The function is blocking (SQL query), so the edit_profile function runs it in the threadpool.
+
     Raises:
      HTTPException: An error occurred in the SQL query or database connection.
       psycopg2.Error instance with status code 500.
@@ -770,25 +841,29 @@ async def edit_password(password: str, confirm_password: str, id: str) -> bool:
           a general exception. Exception instance with status code 500.
     """
     try:
-        salty_password, hashed_password = await generate_new_hashed_password(password, confirm_password)
-
-        conn = pool.getconn()
-        cursor = conn.cursor()
+        # Argon2 keeps the salt inside of the hash, the password_salt column is emptied with new hash.
+        password_salt = "" if hashed_password is not None else None
         query = ("""UPDATE users_auth
-                              SET password_salt = %s, password_hash = %s
-                              WHERE id = %s""")
-        cursor.execute(query, (salty_password, hashed_password, id))
-        conn.commit()
-        cursor.close()
-        pool.putconn(conn)
+                    SET username = COALESCE(%s, username),
+                        email = COALESCE(%s, email),
+                        password_salt = COALESCE(%s, password_salt),
+                        password_hash = COALESCE(%s, password_hash)
+                    WHERE id = %s
+                      AND (%s::text IS NULL OR NOT EXISTS (SELECT 1 FROM users_auth WHERE email = %s))""")
+        try:
+            rowcount = execute_and_commit(query, (username, email, password_salt, hashed_password, id, email, email))
+        except psycopg2.errors.UniqueViolation:
+            # The NOT EXISTS check does not see the email of a concurrent transaction
+            # which is not committed yet, the unique index users_auth_email_idx rejects it.
+            return False
 
-        if cursor.rowcount > 0:
+        if rowcount > 0:
             return True
         else:
             return False
 
     except psycopg2.Error as e:
-        print(f"Error executing SQL query: {e}")
+        logger.exception("Error executing SQL query: %s", e)
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
@@ -833,7 +908,7 @@ async def delete_account(credentials: HTTPAuthorizationCredentials = Depends(sec
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return detail_response(404, "User not found.", key="Not Found")
 
 
         user_id = token_access_value
@@ -841,21 +916,17 @@ async def delete_account(credentials: HTTPAuthorizationCredentials = Depends(sec
         if not user_id:
             raise HTTPException(status_code=400, detail="Bad Request: User ID is required.")
 
-        conn = pool.getconn()
-        cursor = conn.cursor()
         query = ("""DELETE FROM users_auth
                         WHERE id = %s""")
-        cursor.execute(query, (user_id,))
-        conn.commit()
-        cursor.close()
-        pool.putconn(conn)
-        if cursor.rowcount == 0:
+        rowcount = await run_in_threadpool(execute_and_commit, query, (user_id,))
+        existing_users.pop(user_id, None)
+        if rowcount == 0:
             raise HTTPException(status_code=404, detail="Not Found: User not found.")
 
-        return JSONResponse(status_code=200, content={"detail": "OK: Account deleted successfully."})
+        return detail_response(200, "OK: Account deleted successfully.")
 
     except psycopg2.Error as e:
-        print(f"Error executing SQL query: {e}")
+        logger.exception("Error executing SQL query: %s", e)
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
@@ -877,6 +948,9 @@ async def token_access(credentials: HTTPAuthorizationCredentials = Depends(secur
 
           If the user_id is found in the token, then return its value.
 
+      The user found in the database is remembered for 30 seconds,
+      so the next requests with his token skip the SQL query.
+
    Raises:
       HTTPException: Token expired or is no longer available.
            jwt.ExpiredSignatureError instance with status code 401.
@@ -885,15 +959,19 @@ async def token_access(credentials: HTTPAuthorizationCredentials = Depends(secur
    """
     try:
         token = credentials.credentials
-        decoded_token = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
+        decoded_token = Tokenization.jwt_token_verification(token)
 
         user_id = decoded_token.get("id")
         if user_id:
-            db_user_id = await get_user_id(user_id)
-            if db_user_id[0] is None:
+            if user_id in existing_users:
+                return user_id
+
+            db_user_id = await run_in_threadpool(get_user_id, user_id)
+            if db_user_id is None or db_user_id[0] is None:
                 return None
 
             if user_id == db_user_id[0]:
+                existing_users[user_id] = True
                 return user_id
 
     except jwt.ExpiredSignatureError:
@@ -902,7 +980,7 @@ async def token_access(credentials: HTTPAuthorizationCredentials = Depends(secur
         raise HTTPException(status_code=403, detail="Forbidden: Invalid token")
 
 
-async def get_user_id(id: str):
+def get_user_id(id: str):
     """
     Finds user_id in the database according to user id from the token in the sent parameter.
 
@@ -917,20 +995,21 @@ async def get_user_id(id: str):
 
           If the user_id is found in the database, then return its value.
 
+    The function is blocking (SQL query), so the token_access function runs it in the threadpool.
+
     Raises:
        HTTPException: An error occurred, Internal server error. Its is
             a general exception. Exception instance with status code 500.
     """
     try:
-        conn = pool.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT *
-                       FROM users_auth
-                       WHERE id= %s""")
-        cursor.execute(query, (id,))
-        result = cursor.fetchone()
-        cursor.close()
-        pool.putconn(conn)
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            query = ("""SELECT id
+                           FROM users_auth
+                           WHERE id= %s""")
+            execute_prepared(cursor, query, (id,))
+            result = cursor.fetchone()
+            cursor.close()
 
         if cursor.rowcount == 0:
             return None
@@ -4,9 +4,15 @@ SSL certificate generation for a server application HTTPS for
 secure communication.
 """
 
+import datetime
+import os
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
-from OpenSSL import crypto
 
 load_dotenv()
 
@@ -24,6 +30,12 @@ class Settings(BaseSettings):
         DATABASE_PASSWORD: Password for database access.
         JWT_SECRET_KEY: Secret key for JWT token generation.
         ALGORITHM: Algorithm used for JWT token encryption.
+        DB_POOL_MIN: Number of database connections kept open in the pool.
+        DB_POOL_MAX: Maximum number of database connections in the pool, the requests
+            over it wait for a free connection.
+        DB_POOL_TIMEOUT: Seconds to wait for a free database connection before the request fails.
+        DB_PREPARED_STATEMENTS: Use server-side prepared statements, must be disabled
+            when the database is behind PgBouncer in the transaction pooling mode.
     """
     class Config:
         """
@@ -40,45 +52,65 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str
     JWT_SECRET_KEY: str
     ALGORITHM: str
+    DB_POOL_MIN: int = 1
+    DB_POOL_MAX: int = 8
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_PREPARED_STATEMENTS: bool = True
 
 
 settings = Settings()
 
 ##chatgpt
-def generate_ssl_cert_and_key(key_length=2048, days_valid=365):
+def generate_ssl_cert_and_key(days_valid=365, renew_before_days=30):
     """
     Function to generate SSL certificate and private key.
 
+    The existing certificate is reused until it is about to expire.
+    The key is ECDSA P-256, its generation and TLS handshakes are much cheaper
+    than with RSA 2048 and it is supported by all TLS clients.
+
     Args:
-        key_length:
-            The length of the generated key, by default is 2048.
         days_valid:
             Number of days the certificate will be valid, by default it is one year.
+        renew_before_days:
+            The certificate is generated again if it expires in less days than this,
+            by default 30 days.
     """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if os.path.exists('cert.pem') and os.path.exists('key.pem'):
+        with open('cert.pem', "rb") as certfile:
+            cert = x509.load_pem_x509_certificate(certfile.read())
+        if cert.not_valid_after_utc - now > datetime.timedelta(days=renew_before_days):
+            return
+
     # Generate a key pair
-    key = crypto.PKey()
-    key.generate_key(crypto.TYPE_RSA, key_length)
+    key = ec.generate_private_key(ec.SECP256R1())
 
     # Create a self-signed certificate
-    cert = crypto.X509()
-    cert.get_subject().C = "SK"  # Country Name
-    cert.get_subject().ST = "BA"  # State or Province Name
-    cert.get_subject().L = "BA"  # Locality Name
-    cert.get_subject().O = "MTAA"  # Organization Name
-    cert.get_subject().CN = "localhost"  # Common Name
-    cert.set_serial_number(1000)
-    cert.gmtime_adj_notBefore(0)
-    cert.gmtime_adj_notAfter(days_valid * 24 * 60 * 60)
-    cert.set_issuer(cert.get_subject())
-    cert.set_pubkey(key)
-    cert.sign(key, 'sha256')
+    subject = x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, "SK"),
+        x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, "BA"),
+        x509.NameAttribute(NameOID.LOCALITY_NAME, "BA"),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, "MTAA"),
+        x509.NameAttribute(NameOID.COMMON_NAME, "localhost"),
+    ])
+    cert = (x509.CertificateBuilder()
+            .subject_name(subject)
+            .issuer_name(subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=days_valid))
+            .sign(key, hashes.SHA256()))
 
     # Write certificate and private key to files
     with open('cert.pem', "wb") as certfile:
-        certfile.write(crypto.dump_certificate(crypto.FILETYPE_PEM, cert))
+        certfile.write(cert.public_bytes(serialization.Encoding.PEM))
 
     with open('key.pem', "wb") as keyfile:
-        keyfile.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+        keyfile.write(key.private_bytes(serialization.Encoding.PEM,
+                                        serialization.PrivateFormat.TraditionalOpenSSL,
+                                        serialization.NoEncryption()))
     print("SSL certificate and key generated successfully.")
 
 #generate_ssl_cert_and_key()
@@ -15,86 +15,113 @@ A brief overview of exported classes and their usage:
     security = HTTPBearer()
         in the authorization requests of user, example:
             async def activities(credentials: HTTPAuthorizationCredentials =
-                Depends(security)) -> JSONResponse:
+                Depends(security)) -> ORJSONResponse:
 
     for handling database connection for client and server:
-        pool_client = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
+        pool_client = BlockingConnectionPool(
+            minconn=settings.DB_POOL_MIN,
+            maxconn=settings.DB_POOL_MAX,
             dbname=settings.DATABASE_NAME_CLIENT,
-            host=settings.DATABASE_HOST,
-            port=settings.DATABASE_PORT,
-            user=settings.DATABASE_USER,
-            password=settings.DATABASE_PASSWORD
+            ...
         )
 
-        pool_server = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
-            dbname=settings.DATABASE_NAME_SERVER,
-            host=settings.DATABASE_HOST,
-            port=settings.DATABASE_PORT,
-            user=settings.DATABASE_USER,
-            password=settings.DATABASE_PASSWORD
-        )
+        pool_server, the pool of the server database shared with the authentication
+        endpoints (app.auth.authentication.pool)
+
+    The SQL queries are blocking, the endpoints run them in the threadpool
+    (run_in_threadpool), so the event loop keeps serving other requests.
 """
 
+import asyncio
 import decimal
-from math import radians, sin, cos, sqrt, atan2
-from typing import Dict
+import re
+from math import pi, radians, degrees, sin, cos, asin
+from typing import Optional
 import uuid
-import base64
-import jwt
-from OpenSSL import crypto
+import orjson
 from datetime import datetime, timezone
-import psycopg2.pool
+from psycopg2.extras import execute_values
+from cachetools import TTLCache
 from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, HTTPAuthorizationCredentials, HTTPBearer
-from starlette.responses import JSONResponse
-from app.auth.Tokenization import Tokenization
-from app.auth.authentication import token_access
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field, model_validator
+from app.auth.authentication import token_access, execute_prepared, get_conn, BlockingConnectionPool
+from app.auth.authentication import pool as pool_server
 from app.config.config import settings
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth")
 security = HTTPBearer()
+gps_pattern = re.compile(r"-?[0-9]{1,3}(\.[0-9]+)?, -?[0-9]{1,3}(\.[0-9]+)?\Z")
 
-pool_client = psycopg2.pool.SimpleConnectionPool(
-    minconn=1,
-    maxconn=10,
+
+class LocationInput(BaseModel):
+    """
+    Body of the location places request.
+
+    The location is sent either as the "lat" and "lon" numbers or as the "gps" text
+    "latitude, longitude", the same as the places have it. The gps text is parsed
+    into lat and lon by the validator, an invalid body is rejected with 422.
+    """
+    gps: Optional[str] = None
+    lat: Optional[float] = Field(default=None, ge=-90, le=90)
+    lon: Optional[float] = Field(default=None, ge=-180, le=180)
+    radius_km: float = Field(default=2.0, gt=0)
+
+    @model_validator(mode="after")
+    def parse_location(self):
+        """
+        Checks that the location is sent and parses the gps text into lat and lon.
+
+        Returns:
+            The validated body with both lat and lon set.
+
+        Raises:
+            ValueError: Neither lat and lon nor valid gps is sent.
+        """
+        if self.lat is not None and self.lon is not None:
+            return self
+        if self.gps is None:
+            raise ValueError('Either "lat" and "lon" or "gps" is required')
+        if not gps_pattern.match(self.gps):
+            raise ValueError('"gps" must be in the format "<latitude>, <longitude>"')
+        lat, lon = map(float, self.gps.split(", "))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError('"gps" latitude must be within ±90 and longitude within ±180')
+        self.lat, self.lon = lat, lon
+        return self
+
+
+pool_client = BlockingConnectionPool(
+    minconn=settings.DB_POOL_MIN,
+    maxconn=settings.DB_POOL_MAX,
     dbname=settings.DATABASE_NAME_CLIENT,
     host=settings.DATABASE_HOST,
     port=settings.DATABASE_PORT,
     user=settings.DATABASE_USER,
-    password=settings.DATABASE_PASSWORD
+    password=settings.DATABASE_PASSWORD,
+    keepalives=1,
+    keepalives_idle=30,
+    keepalives_interval=10,
+    keepalives_count=5
 )
-pool_server = psycopg2.pool.SimpleConnectionPool(
-    minconn=1,
-    maxconn=10,
-    dbname=settings.DATABASE_NAME_SERVER,
-    host=settings.DATABASE_HOST,
-    port=settings.DATABASE_PORT,
-    user=settings.DATABASE_USER,
-    password=settings.DATABASE_PASSWORD
-)
-
-
-def haversine(coord1: tuple, coord2: tuple) -> float:
-    """
-    Calculates the great-circle distance between two points on the map.
-
-    Args:
-      coord1:
-          A tuple containing latitude and longitude of the first point.
-      coord2:
-          A tuple containing latitude and longitude of the second point.
-
-    Returns:
-        The distance between the two points in kilometers in float type.
-    """
-    lat1, lon1 = radians(coord1[0]), radians(coord1[1])
-    lat2, lon2 = radians(coord2[0]), radians(coord2[1])
-    return 6371.0 * (2 * atan2(sqrt((sin((lat2 - lat1) / 2)**2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2)**2)), sqrt(1 - (sin((lat2 - lat1) / 2)**2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2)**2))))
+# Columns of places which can be used as the category filter.
+categories = frozenset(("meals", "accomodation", "sport", "hiking", "fun", "events"))
+# Type OIDs of bool, int8, int2, int4, text, char and varchar columns, psycopg2 returns
+# their values as bool, int and str, which do not need serialize_datetime_and_decimal.
+plain_types = frozenset((16, 20, 21, 23, 25, 1042, 1043))
+# All places, shared by /api/get_all_places and /api/place_category. The endpoints
+# changing places clear it, the other workers see the change in 30 seconds.
+places_cache = TTLCache(maxsize=1, ttl=30)
+# JSON text of the places created by users, for /api/get_my_places and /api/get_my_place.
+# It is cleared the same way as places_cache by the endpoints changing my_places,
+# through clear_my_places_cache, which also increases my_places_generation.
+my_places_cache = TTLCache(maxsize=1024, ttl=30)
+my_places_generation = 0
+# [lock, number of requests using the lock] for each key of my_places_cache being loaded.
+my_places_locks = {}
 
 
 def serialize_datetime_and_decimal(obj):
@@ -120,6 +147,10 @@ def zip_objects_from_db(data: list, cursor) -> list:
     """
     Zips objects retrieved from the database with cursor metadata.
 
+    The column names are read from the cursor once for all rows, the values
+    of text, boolean and integer columns are already JSON serializable,
+    so only the other columns are passed to serialize_datetime_and_decimal.
+
     Args:
       data:
         Data to in the list of tuples (colum - value) from database
@@ -129,8 +160,380 @@ def zip_objects_from_db(data: list, cursor) -> list:
     Returns:
         A list of dictionaries, where each dictionary has a row of data.
     """
-    return [dict(zip((key[0] for key in cursor.description),
-                     [serialize_datetime_and_decimal(value) for value in row])) for row in data]
+    keys = [column.name for column in cursor.description]
+    serialized = [i for i, column in enumerate(cursor.description) if column.type_code not in plain_types]
+    if not serialized:
+        return [dict(zip(keys, row)) for row in data]
+    records = []
+    for row in data:
+        values = list(row)
+        for i in serialized:
+            values[i] = serialize_datetime_and_decimal(values[i])
+        records.append(dict(zip(keys, values)))
+    return records
+
+
+def fetch_records(query: str, params=None) -> list:
+    """
+    Runs the SELECT query on the client database.
+
+    The query is executed as a server-side prepared statement, so it is parsed
+    and planned only once per connection. The function is blocking, so the endpoints
+    run it in the threadpool.
+
+    Args:
+      query:
+        SQL query with %s placeholders.
+      params:
+        Parameters of the query.
+
+    Returns:
+        A list of dictionaries, where each dictionary has a row of data.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, query, params)
+        return zip_objects_from_db(cursor.fetchall(), cursor)
+
+
+def fetch_json(query: str, params=None) -> Optional[str]:
+    """
+    Runs the query which returns one JSON value (json_agg) on the client database.
+
+    The rows are serialized to JSON already by the database, the endpoint sends
+    the text as it is, without building and serializing Python objects.
+    The function is blocking, so the endpoints run it in the threadpool.
+
+    Args:
+      query:
+        SQL query with %s placeholders.
+      params:
+        Parameters of the query.
+
+    Returns:
+        The JSON text or None if the query has no rows.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, query, params)
+        return cursor.fetchone()[0]
+
+
+def execute_and_commit(query: str, params=None):
+    """
+    Runs the modifying query on the client database and commits it.
+
+    The query is executed as a server-side prepared statement, the same as in fetch_records.
+    The function is blocking, so the endpoints run it in the threadpool.
+
+    Args:
+      query:
+        SQL query with %s placeholders.
+      params:
+        Parameters of the query.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        execute_prepared(cursor, query, params)
+        conn.commit()
+
+
+def add_favourite_place(activity_id: str) -> bool:
+    """
+    Copies the place into favourites, if it is not there yet.
+
+    The place is copied by one INSERT ... SELECT, the place already in favourites
+    is skipped by ON CONFLICT, so there is no separate check before.
+
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Args:
+      activity_id:
+        Id of the place.
+
+    Returns:
+        True if the place was added, False if it is already in favourites
+        or it does not exist.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        query = ("""INSERT INTO favourites (id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
+                    SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    FROM places
+                    WHERE id = %s
+                    ON CONFLICT (id) DO NOTHING
+                    RETURNING id""")
+        execute_prepared(cursor, query, [activity_id])
+        added = cursor.fetchone() is not None
+        conn.commit()
+        return added
+
+
+def delete_favourite_place(activity_id: str) -> bool:
+    """
+    Deletes the place from favourites.
+
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Args:
+      activity_id:
+        Id of the place.
+
+    Returns:
+        True if the place was deleted, False if it is not in favourites.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        query = ("""SELECT id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    FROM favourites
+                    WHERE id = %s""")
+        execute_prepared(cursor, query, [activity_id])
+        if not cursor.fetchone():
+            return False
+        query = ("""DELETE FROM favourites
+                    WHERE id = %s""")
+        execute_prepared(cursor, query, [activity_id])
+        conn.commit()
+        return True
+
+
+def delete_place_note(activity_id: str) -> bool:
+    """
+    Deletes the note of the place.
+
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Args:
+      activity_id:
+        Id of the place.
+
+    Returns:
+        True if the note was deleted, False if the place does not have a note.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        query = ("""DELETE FROM notes
+                    WHERE id= %s
+                    RETURNING id""")
+        execute_prepared(cursor, query, [activity_id])
+        if not cursor.fetchone():
+            conn.rollback()
+            return False
+        conn.commit()
+        return True
+
+
+def insert_created_place(values: tuple):
+    """
+    Inserts the place created by user into my_places and places.
+
+    Both rows are inserted by one statement and committed together.
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Args:
+      values:
+        Values of all 13 columns of the place, starting with its id.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        query = ("""WITH inserted AS (
+                        INSERT INTO my_places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
+                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                        RETURNING id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    )
+                    INSERT INTO places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
+                    SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    FROM inserted""")
+        execute_prepared(cursor, query, values)
+        conn.commit()
+
+
+def replace_created_place(values: tuple) -> bool:
+    """
+    Replaces the place created by user in my_places and places.
+
+    The rows are updated in place by one statement, the place is upserted into places
+    on its primary key (migrations/006_client_keys_and_indexes.sql), so it is inserted
+    again if it is not there (update_databse removes it).
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Args:
+      values:
+        Values of all 13 columns of the place, starting with its id.
+
+    Returns:
+        True if the place was replaced, False if it is not in my_places.
+    """
+    params = values[1:] + values[:1]
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        query = ("""WITH updated AS (
+                        UPDATE my_places
+                        SET name=%s, image_name=%s, description=%s, contact=%s, address=%s, gps=%s,
+                            meals=%s, accomodation=%s, sport=%s, hiking=%s, fun=%s, events=%s
+                        WHERE id=%s
+                        RETURNING id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    )
+                    INSERT INTO places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
+                    SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    FROM updated
+                    ON CONFLICT (id) DO UPDATE
+                    SET name=EXCLUDED.name, image_name=EXCLUDED.image_name, description=EXCLUDED.description,
+                        contact=EXCLUDED.contact, address=EXCLUDED.address, gps=EXCLUDED.gps,
+                        meals=EXCLUDED.meals, accomodation=EXCLUDED.accomodation, sport=EXCLUDED.sport,
+                        hiking=EXCLUDED.hiking, fun=EXCLUDED.fun, events=EXCLUDED.events
+                    RETURNING id""")
+        execute_prepared(cursor, query, params)
+        if cursor.fetchone() is None:
+            conn.rollback()
+            return False
+        conn.commit()
+        return True
+
+
+def delete_created_place(place_id: str) -> bool:
+    """
+    Deletes the place created by user from my_places and places.
+
+    Both rows are deleted by one statement, the row from places only
+    if the place was deleted from my_places.
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Args:
+      place_id:
+        Id of the place.
+
+    Returns:
+        True if the place was deleted, False if it is not in my_places.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor:
+        query = ("""WITH deleted AS (
+                        DELETE FROM my_places
+                        WHERE id=%s
+                        RETURNING id
+                    ), deleted_places AS (
+                        DELETE FROM places
+                        WHERE id IN (SELECT id FROM deleted)
+                    )
+                    SELECT id FROM deleted""")
+        execute_prepared(cursor, query, [place_id])
+        if not cursor.fetchone():
+            conn.rollback()
+            return False
+        conn.commit()
+        return True
+
+
+def copy_places_from_server() -> bool:
+    """
+    Replaces the places in the client database with the places from the server database.
+
+    The places are replaced in one transaction, so the other requests see
+    either the old or the new places, never an empty or half copied table.
+    The rows are read through the server-side cursor and inserted in batches,
+    so only one batch of rows is held in memory at a time. The server places
+    without id or with an id copied already are skipped, places has a primary key
+    on id (migrations/006_client_keys_and_indexes.sql).
+    The function is blocking, so the endpoint runs it in the threadpool.
+
+    Returns:
+        True if any place was copied, else False.
+    """
+    with get_conn(pool_client) as conn, conn.cursor() as cursor, \
+            get_conn(pool_server) as conn_server, conn_server.cursor(name="places_copy") as cursor_server:
+        query = ("""DELETE FROM places""")
+        cursor.execute(query)
+
+        # image_data of the server places is not copied, so it is not read at all.
+        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    FROM places
+                    WHERE id IS NOT NULL""")
+        cursor_server.execute(query)
+
+        query = ("""INSERT INTO places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
+                    VALUES %s
+                    ON CONFLICT (id) DO NOTHING""")
+        pom = 0
+        while True:
+            rows = cursor_server.fetchmany(10000)
+            if not rows:
+                break
+            execute_values(cursor, query, rows, page_size=1000)
+            pom = 1
+        conn.commit()
+        return pom == 1
+
+
+async def get_places() -> list:
+    """
+    Gets all places from the cache, loads them from the database when the cache is empty.
+
+    Returns:
+        A list of dictionaries, where each dictionary is one place.
+    """
+    records = places_cache.get("places")
+    if records is None:
+        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                    FROM places""")
+        records = await run_in_threadpool(fetch_records, query)
+        places_cache["places"] = records
+    return records
+
+
+def clear_my_places_cache():
+    """
+    Clears the cached JSON of the places created by users after they were changed.
+
+    The generation is increased as well, so the result of a query which was already
+    running during the change is not stored in the cache.
+    """
+    global my_places_generation
+    my_places_generation += 1
+    my_places_cache.clear()
+
+
+async def get_my_places_json(place_id=None, all_places: bool = False) -> Optional[str]:
+    """
+    Gets the places created by users as JSON text from the cache,
+    loads them from the database when they are not cached.
+
+    The concurrent requests for the same uncached key wait for the first one
+    and take its result from the cache, so the query runs only once. The result
+    is cached only if my_places was not changed while the query was running.
+
+    Args:
+      place_id:
+        Id of the place to get.
+      all_places:
+        Get all places created by users instead of the one with place_id.
+
+    Returns:
+        The JSON array of the places or None if there is no such place.
+    """
+    key = ("all",) if all_places else ("id", place_id)
+    if key in my_places_cache:
+        return my_places_cache[key]
+    entry = my_places_locks.get(key)
+    if entry is None:
+        entry = my_places_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            if key in my_places_cache:
+                return my_places_cache[key]
+            generation = my_places_generation
+            if all_places:
+                query = ("""SELECT json_agg(p)::text
+                            FROM (SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                                  FROM my_places) AS p""")
+                records = await run_in_threadpool(fetch_json, query)
+            else:
+                query = ("""SELECT json_agg(p)::text
+                            FROM (SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
+                                  FROM my_places
+                                  WHERE id = %s) AS p""")
+                records = await run_in_threadpool(fetch_json, query, [place_id])
+            if generation == my_places_generation:
+                my_places_cache[key] = records
+            return records
+    finally:
+        # The lock is dropped only when no other request waits for it, a new request
+        # would otherwise create a second lock and run the same query again.
+        entry[1] -= 1
+        if not entry[1]:
+            del my_places_locks[key]
 
 
 @router.get("/status")
@@ -150,19 +553,14 @@ async def status() -> dict:
 
     Returned response is always JSON object with HTTP/HTTPS status code.
     """
-    conn = pool_client.getconn()
-    cursor = conn.cursor()
-    cursor.execute("SELECT version();")
-    version = cursor.fetchone()[0]
-    cursor.close()
-    pool_client.putconn(conn)
+    records = await run_in_threadpool(fetch_records, "SELECT version();")
     return {
-        'version': version
+        'version': records[0]["version"]
     }
 
 
 @router.get("/api/get_all_places")
-async def activities(credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def activities(credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Gets all activities in the app from the databse.
 
@@ -172,7 +570,7 @@ async def activities(credentials: HTTPAuthorizationCredentials = Depends(securit
         with security instance of HTTPBearer.
 
     Returns:
-       A JSONResponse of the HTTP/HTTPS status code of the request with
+       An ORJSONResponse of the HTTP/HTTPS status code of the request with
        description content. For example:
 
            If the user is not authorized:
@@ -218,29 +616,19 @@ async def activities(credentials: HTTPAuthorizationCredentials = Depends(securit
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM places""")
-        cursor.execute(query)
-
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=200, content={"items": records})
+        records = await get_places()
+        if records:
+            return ORJSONResponse(status_code=200, content={"items": records})
         else:
-            return JSONResponse(status_code=204, content={"detail": "No records found"})
+            return ORJSONResponse(status_code=204, content={"detail": "No records found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.get("/api/place")
-async def activities(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def activities(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Gets one specific activity in the app from the database, according to user request.
 
@@ -252,7 +640,7 @@ async def activities(request: Request, credentials: HTTPAuthorizationCredentials
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -299,30 +687,24 @@ async def activities(request: Request, credentials: HTTPAuthorizationCredentials
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         id = input.get("id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
         query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
                     FROM places
                     where id= %s""")
-        cursor.execute(query, [id])
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=200, content={"items": records})
+        records = await run_in_threadpool(fetch_records, query, [id])
+        if records:
+            return ORJSONResponse(status_code=200, content={"items": records})
         else:
-            return JSONResponse(status_code=204, content={"detail": "No records found"})
+            return ORJSONResponse(status_code=204, content={"detail": "No records found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.get("/api/get_all_favourites")
-async def favourites(credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def favourites(credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Gets all user's favourites activities in the app from the database.
 
@@ -332,7 +714,7 @@ async def favourites(credentials: HTTPAuthorizationCredentials = Depends(securit
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -380,39 +762,33 @@ async def favourites(credentials: HTTPAuthorizationCredentials = Depends(securit
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
         query = ("""SELECT id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
                     FROM favourites""")
-        cursor.execute(query)
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=200, content={"items": records})
+        records = await run_in_threadpool(fetch_records, query)
+        if records:
+            return ORJSONResponse(status_code=200, content={"items": records})
         else:
-            return JSONResponse(status_code=204, content={"detail": "No records found"})
+            return ORJSONResponse(status_code=204, content={"detail": "No records found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.get("/api/location_places")
-async def location_activities(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def location_activities(body: LocationInput, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Gets activities in the app for user according to his gps location.
 
     Args:
-        request:
-            Body of the post request. Request instance of the FastAPI.
+        body:
+            Body of the request with the user location and optional radius in kilometers.
         credentials:
             Bearer token to authorize. HTTPAuthorizationCredentials instance
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -421,7 +797,10 @@ async def location_activities(request: Request, credentials: HTTPAuthorizationCr
                   "detail": "Internal server error: 'NoneType' object is not subscriptable"
               }
 
-         If the database is empty then:
+         If the body has neither "lat" and "lon" nor valid "gps", or the values are out of range:
+             INFO:     127.0.0.1:58208 - "GET /api/location_places HTTP/1.1" 422 Unprocessable Entity
+
+         If there is no place near the user then:
              INFO:     127.0.0.1:58208 - "GET /api/location_places HTTP/1.1" 204 No Content
              {
                   "detail": "No records found"
@@ -460,37 +839,46 @@ async def location_activities(request: Request, credentials: HTTPAuthorizationCr
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
-        gps = input.get("gps")
-        gps = str(gps)
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
+        lat, lon = body.lat, body.lon
+        # The great-circle (haversine) distance is computed by the database, only the places
+        # within the radius are sent back. The bounding box of the circle is checked first,
+        # it is cheap and the latitude range can use the places_lat_idx index.
         query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM places""")
-        cursor.execute(query)
-        data = cursor.fetchall()
-        new_data = []
-        for i in data:
-            coord = i[6].split(", ")
-            coord_user = gps.split(", ")
-            if haversine((float(coord_user[0]), float(coord_user[1])), (float(coord[0]), float(coord[1]))) <= 2:#############radius in km
-                new_data.append(i)
-
-        records = zip_objects_from_db(new_data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=200, content={"items": records})
+                    FROM places
+                    CROSS JOIN LATERAL (SELECT power(sin((radians(lat) - %s) / 2), 2)
+                                               + %s * cos(radians(lat)) * power(sin((radians(lon) - %s) / 2), 2) AS a) AS h
+                    WHERE lat BETWEEN %s AND %s
+                    AND lon BETWEEN %s AND %s
+                    AND 6371.0 * 2 * asin(sqrt(least(1.0, a))) <= %s""")
+        # The user's coordinates in radians and the cosine of his latitude are the same
+        # for every place, they are computed here once instead of for every row.
+        dlat = body.radius_km / 111.195
+        # The widest longitude difference inside the circle, near the poles, over the
+        # antimeridian and for the radius over a quarter of the Earth's circumference
+        # the whole range of longitudes is searched.
+        distance = radians(dlat)
+        if distance < pi / 2 and sin(distance) < cos(radians(lat)):
+            dlon = degrees(asin(sin(distance) / cos(radians(lat))))
+        else:
+            dlon = 180
+        lon_min, lon_max = lon - dlon, lon + dlon
+        if lon_min < -180 or lon_max > 180:
+            lon_min, lon_max = -180, 180
+        records = await run_in_threadpool(fetch_records, query, (radians(lat), cos(radians(lat)), radians(lon),
+                                                                 lat - dlat, lat + dlat, lon_min, lon_max,
+                                                                 body.radius_km))
+        if records:
+            return ORJSONResponse(status_code=200, content={"items": records})
         else:
-            return JSONResponse(status_code=204, content={"detail": "No records found"})
+            return ORJSONResponse(status_code=204, content={"detail": "No records found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.get("/api/place_category")
-async def category(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def category(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Gets activities in the app for user according to chosen category.
 
@@ -502,7 +890,7 @@ async def category(request: Request, credentials: HTTPAuthorizationCredentials =
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -550,56 +938,24 @@ async def category(request: Request, credentials: HTTPAuthorizationCredentials =
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         category = input.get("category")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        if category == "meals":
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE meals='TRUE' """)
-        elif category == "accomodation":
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE accomodation='TRUE' """)
-        elif category == "sport":
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE sport='TRUE' """)
-        elif category == "hiking":
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE hiking='TRUE' """)
-        elif category == "fun":
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE fun='TRUE' """)
-        elif category == "events":
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE events='TRUE' """)
-        else:
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=204, content={"detail": "Category does not exist"})
-
-        cursor.execute(query, category)
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=200, content={"items": records})
+        if not isinstance(category, str) or category not in categories:
+            return ORJSONResponse(status_code=204, content={"detail": "Category does not exist"})
+
+        records = [record for record in await get_places() if record[category] == "TRUE"]
+        if records:
+            return ORJSONResponse(status_code=200, content={"items": records})
         else:
-            return JSONResponse(status_code=204, content={"detail": "No records found"})
+            return ORJSONResponse(status_code=204, content={"detail": "No records found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.post("/api/add_favourite")
-async def add_favourit(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def add_favourit(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Posts user's favourite activity into favourites list.
 
@@ -611,7 +967,7 @@ async def add_favourit(request: Request, credentials: HTTPAuthorizationCredentia
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -620,7 +976,7 @@ async def add_favourit(request: Request, credentials: HTTPAuthorizationCredentia
                 "detail": "Not authenticated"
              }
 
-         If the place is already in favourites:
+         If the place is already in favourites or it does not exist:
              INFO:     127.0.0.1:60040 - "POST /api/add_favourite HTTP/1.1" 205 Reset Content
              {
                 "detail": "Place already in favourites"
@@ -642,42 +998,20 @@ async def add_favourit(request: Request, credentials: HTTPAuthorizationCredentia
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         activity_id = input.get("activity_id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM favourites
-                    WHERE id = %s""")
-        cursor.execute(query, [activity_id])
-        data = cursor.fetchone()
-        cursor.close()
-        pool_client.putconn(conn)
-        if not data:
-            conn = pool_client.getconn()
-            cursor = conn.cursor()
-            query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                        FROM places
-                        WHERE id = %s""")
-            cursor.execute(query, [activity_id])
-            place_id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events = cursor.fetchone()
-            query = ("""INSERT INTO favourites (id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""")
-            cursor.execute(query, (place_id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events))
-            conn.commit()
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=201, content={"detail": "OK: Place added to favourites."})
+        if await run_in_threadpool(add_favourite_place, activity_id):
+            return ORJSONResponse(status_code=201, content={"detail": "OK: Place added to favourites."})
         else:
-            return JSONResponse(status_code=205, content={"detail": "Place already in favourites"})
+            return ORJSONResponse(status_code=205, content={"detail": "Place already in favourites"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.post("/api/delete_favourite")
-async def delete_favourit(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def delete_favourit(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Deletes user's favourite activity from the favourites list.
 
@@ -689,7 +1023,7 @@ async def delete_favourit(request: Request, credentials: HTTPAuthorizationCreden
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -720,33 +1054,20 @@ async def delete_favourit(request: Request, credentials: HTTPAuthorizationCreden
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         activity_id = input.get("activity_id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM favourites
-                    WHERE id = %s""")
-        cursor.execute(query, [activity_id])
-        data = cursor.fetchone()
-        if data:
-            query = ("""DELETE FROM favourites
-                        WHERE id = %s""")
-            cursor.execute(query, [activity_id])
-            conn.commit()
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=201, content={"detail": "OK: Place deleted from favourites."})
+        if await run_in_threadpool(delete_favourite_place, activity_id):
+            return ORJSONResponse(status_code=201, content={"detail": "OK: Place deleted from favourites."})
         else:
-            return JSONResponse(status_code=205, content={"detail": "Place not in favourites"})
+            return ORJSONResponse(status_code=205, content={"detail": "Place not in favourites"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.put("/api/add_edit_note")
-async def add_note(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def add_note(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     User can put his note into the app.
 
@@ -758,7 +1079,7 @@ async def add_note(request: Request, credentials: HTTPAuthorizationCredentials =
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -783,31 +1104,26 @@ async def add_note(request: Request, credentials: HTTPAuthorizationCredentials =
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         activity_id = input.get("activity_id")
         note = input.get("note")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
         query = ("""INSERT INTO notes
                     VALUES (%s,%s)
                     ON CONFLICT(id)
                     DO UPDATE
                     SET note = %s
                     WHERE notes.id = %s""")
-        cursor.execute(query, (activity_id, note, note, activity_id))
-        conn.commit()
-        cursor.close()
-        pool_client.putconn(conn)
-        return JSONResponse(status_code=201, content={"detail": "OK: Note added to place."})
+        await run_in_threadpool(execute_and_commit, query, (activity_id, note, note, activity_id))
+        return ORJSONResponse(status_code=201, content={"detail": "OK: Note added to place."})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.delete("/api/delete_note")
-async def add_note(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def add_note(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
      User can delete his note from the app.
 
@@ -819,7 +1135,7 @@ async def add_note(request: Request, credentials: HTTPAuthorizationCredentials =
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -850,35 +1166,20 @@ async def add_note(request: Request, credentials: HTTPAuthorizationCredentials =
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         activity_id = input.get("activity_id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT *
-                    FROM notes
-                    WHERE id=%s""")
-        cursor.execute(query, [activity_id])
-        data = cursor.fetchone()
-        if data:
-            query = ("""DELETE FROM notes
-                        WHERE id= %s""")
-            cursor.execute(query, [activity_id])
-            conn.commit()
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=201, content={"detail": "OK: Note deleted."})
+        if await run_in_threadpool(delete_place_note, activity_id):
+            return ORJSONResponse(status_code=201, content={"detail": "OK: Note deleted."})
         else:
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=205, content={"detail": "FAIL: Note does not exist."})
+            return ORJSONResponse(status_code=205, content={"detail": "FAIL: Note does not exist."})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.get("/api/get_note")
-async def get_note(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def get_note(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> Response:
     """
     Gets note from the system for user.
 
@@ -890,7 +1191,7 @@ async def get_note(request: Request, credentials: HTTPAuthorizationCredentials =
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     A JSON response of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -926,30 +1227,24 @@ async def get_note(request: Request, credentials: HTTPAuthorizationCredentials =
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         activity_id = input.get("activity_id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT *
+        query = ("""SELECT json_agg(notes)::text
                     FROM notes
                     WHERE id = %s""")
-        cursor.execute(query, [activity_id])
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=201, content={"note": records})
+        records = await run_in_threadpool(fetch_json, query, [activity_id])
+        if records:
+            return Response(status_code=201, content=f'{{"note":{records}}}', media_type="application/json")
         else:
-            return JSONResponse(status_code=205, content={"detail": "Place does not have notes"})
+            return ORJSONResponse(status_code=205, content={"detail": "Place does not have notes"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.post("/api/add_my_place")
-async def add_place(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def add_place(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     User can place into the system.
 
@@ -961,7 +1256,7 @@ async def add_place(request: Request, credentials: HTTPAuthorizationCredentials
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -986,9 +1281,9 @@ async def add_place(request: Request, credentials: HTTPAuthorizationCredentials
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         name = input.get("name")
         image = input.get("image")
         description = input.get("description")
@@ -1004,25 +1299,17 @@ async def add_place(request: Request, credentials: HTTPAuthorizationCredentials
         #image_data = input.get("image_data")
         gen_uuid = uuid.uuid4()
 
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""INSERT INTO my_places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""")
-        cursor.execute(query,(str(gen_uuid), name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events))
-        conn.commit()
-        query = ("""INSERT INTO places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""")
-        cursor.execute(query, (str(gen_uuid), name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events))
-        conn.commit()
-        cursor.close()
-        pool_client.putconn(conn)
-        return JSONResponse(status_code=201, content={"detail": "OK: Place created."})
+        await run_in_threadpool(insert_created_place, (str(gen_uuid), name, image, description, contact, address, gps,
+                                                       meals, accomodation, sport, hiking, fun, events))
+        places_cache.clear()
+        clear_my_places_cache()
+        return ORJSONResponse(status_code=201, content={"detail": "OK: Place created."})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.put("/api/edit_my_place")
-async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     User can edit his place in the system.
 
@@ -1034,7 +1321,7 @@ async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -1065,9 +1352,9 @@ async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         place_id = input.get("id")
         name = input.get("name")
         image = input.get("image")
@@ -1083,43 +1370,19 @@ async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials
         events = input.get("events")
         #image_data = input.get("image_data")
 
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM my_places
-                    WHERE id = %s""")
-        cursor.execute(query, [place_id])
-        data = cursor.fetchall()
-        if data:
-            query = ("""DELETE FROM my_places
-                        WHERE id=%s""")
-            cursor.execute(query, [place_id])
-            conn.commit()
-            query = ("""DELETE FROM places
-                        WHERE id=%s""")
-            cursor.execute(query, [place_id])
-            conn.commit()
-            query = ("""INSERT INTO my_places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""")
-            cursor.execute(query,(place_id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events))
-            conn.commit()
-            query = ("""INSERT INTO places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""")
-            cursor.execute(query, (place_id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun,events))
-            conn.commit()
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=201, content={"detail": "OK: Place edited."})
+        if await run_in_threadpool(replace_created_place, (place_id, name, image, description, contact, address, gps,
+                                                           meals, accomodation, sport, hiking, fun, events)):
+            places_cache.clear()
+            clear_my_places_cache()
+            return ORJSONResponse(status_code=201, content={"detail": "OK: Place edited."})
         else:
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=205, content={"detail": "OK: Place not found."})
+            return ORJSONResponse(status_code=205, content={"detail": "OK: Place not found."})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.delete("/api/delete_my_place")
-async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     User can delete his place from the system.
 
@@ -1131,7 +1394,7 @@ async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -1162,39 +1425,22 @@ async def edit_place(request: Request, credentials: HTTPAuthorizationCredentials
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         place_id = input.get("id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM my_places
-                    WHERE id = %s""")
-        cursor.execute(query, [place_id])
-        data = cursor.fetchone()
-        if data:
-            query = ("""DELETE FROM my_places
-                        WHERE id=%s""")
-            cursor.execute(query, [place_id])
-            conn.commit()
-            query = ("""DELETE FROM places
-                        WHERE id=%s""")
-            cursor.execute(query, [place_id])
-            conn.commit()
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=201, content={"detail": "OK: Place deleted."})
+        if await run_in_threadpool(delete_created_place, place_id):
+            places_cache.clear()
+            clear_my_places_cache()
+            return ORJSONResponse(status_code=201, content={"detail": "OK: Place deleted."})
         else:
-            cursor.close()
-            pool_client.putconn(conn)
-            return JSONResponse(status_code=205, content={"detail": "OK: Place not found."})
+            return ORJSONResponse(status_code=205, content={"detail": "OK: Place not found."})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 
 @router.get("/api/get_my_places")
-async def get_created_places(credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def get_created_places(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Response:
     """
     Gets all user's places.
 
@@ -1204,7 +1450,7 @@ async def get_created_places(credentials: HTTPAuthorizationCredentials = Depends
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     A JSON response of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -1251,26 +1497,18 @@ async def get_created_places(credentials: HTTPAuthorizationCredentials = Depends
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM my_places""")
-        cursor.execute(query)
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=201, content={"note": records})
+        records = await get_my_places_json(all_places=True)
+        if records:
+            return Response(status_code=201, content=f'{{"note":{records}}}', media_type="application/json")
         else:
-            return JSONResponse(status_code=205, content={"detail": "Place not found"})
+            return ORJSONResponse(status_code=205, content={"detail": "Place not found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 @router.get("/api/get_my_place")
-async def get_created_places(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def get_created_places(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> Response:
     """
     Gets chosen by user his place.
 
@@ -1282,7 +1520,7 @@ async def get_created_places(request: Request, credentials: HTTPAuthorizationCre
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     A JSON response of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -1329,29 +1567,20 @@ async def get_created_places(request: Request, credentials: HTTPAuthorizationCre
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        input = await request.json()
+        input = orjson.loads(await request.body())
         place_id = input.get("id")
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        query = ("""SELECT id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events
-                    FROM my_places
-                    WHERE id = %s""")
-        cursor.execute(query, [place_id])
-        data = cursor.fetchall()
-        records = zip_objects_from_db(data, cursor)
-        cursor.close()
-        pool_client.putconn(conn)
-        if data:
-            return JSONResponse(status_code=201, content={"note": records})
+        records = await get_my_places_json(place_id)
+        if records:
+            return Response(status_code=201, content=f'{{"note":{records}}}', media_type="application/json")
         else:
-            return JSONResponse(status_code=205, content={"detail": "Place not found"})
+            return ORJSONResponse(status_code=205, content={"detail": "Place not found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 @router.put("/api/update_databse")
-async def update_databse(credentials: HTTPAuthorizationCredentials = Depends(security)) -> JSONResponse:
+async def update_databse(credentials: HTTPAuthorizationCredentials = Depends(security)) -> ORJSONResponse:
     """
     Request to update database.
 
@@ -1361,7 +1590,7 @@ async def update_databse(credentials: HTTPAuthorizationCredentials = Depends(sec
             with security instance of HTTPBearer.
 
     Returns:
-     A JSONResponse of the HTTP/HTTPS status code of the request with
+     An ORJSONResponse of the HTTP/HTTPS status code of the request with
      description content. For example:
 
          If the user is not authorized:
@@ -1392,41 +1621,14 @@ async def update_databse(credentials: HTTPAuthorizationCredentials = Depends(sec
         token_access_value = await token_access(credentials)
 
         if token_access_value is None:
-            return JSONResponse(status_code=404, content={"Not Found": "User not found."})
-
-        conn = pool_client.getconn()
-        cursor = conn.cursor()
-        conn_server = pool_server.getconn()
-        cursor_server = conn_server.cursor()
+            return ORJSONResponse(status_code=404, content={"Not Found": "User not found."})
 
-        query = ("""DELETE FROM places""")
-        cursor.execute(query)
-        conn.commit()
-
-        query = ("""SELECT * FROM places""")
-        cursor_server.execute(query)
-
-        pom = 0
-        while True:
-            row = cursor_server.fetchone()
-            if row is None:
-                break
-            place_id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events, image_data = row
-            query = ("""INSERT INTO places (id, name, image_name, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""")
-            cursor.execute(query, (place_id, name, image, description, contact, address, gps, meals, accomodation, sport, hiking, fun, events))
-            conn.commit()
-            pom = 1
-
-        cursor.close()
-        cursor_server.close()
-        pool_client.putconn(conn)
-        pool_server.putconn(conn_server)
-
-        if pom == 1:
-            return JSONResponse(status_code=201, content={"note": "Records updated"})
+        updated = await run_in_threadpool(copy_places_from_server)
+        places_cache.clear()
+        if updated:
+            return ORJSONResponse(status_code=201, content={"note": "Records updated"})
         else:
-            return JSONResponse(status_code=205, content={"detail": "Records not found"})
+            return ORJSONResponse(status_code=205, content={"detail": "Records not found"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
@@ -1435,22 +1637,21 @@ def upload_image(file_path, name):
     """
     Uploads image.
 
+    The function is a maintenance script, it is not called by any endpoint.
+    psycopg2 sends the bytes as bytea directly, without a Binary wrapper.
+
     Args:
         file_path:
             Path to source of image.
         name:
             Name of the image.
     """
-    drawing = open(file_path, 'rb').read()
-    conn = pool_client.getconn()
-    cursor = conn.cursor()
+    with open(file_path, 'rb') as file:
+        drawing = file.read()
     query = ("""UPDATE places
                 SET image_data = %s
                 WHERE name = %s""")
-    cursor.execute(query, (psycopg2.Binary(drawing), name))
-    conn.commit()
-    cursor.close()
-    pool_client.putconn(conn)
+    execute_and_commit(query, (drawing, name))
 
 #upload_image("C:\\Users\\petor\\Downloads\\escape_room.jpg","Escape room TRAPPED")
 #upload_image("C:\\Users\\petor\\Downloads\\koncert.jpg","Fajný koncert")
@@ -27,18 +27,11 @@ A brief overview of exported classes and their usage:
 """
 
 import decimal
-from math import radians, sin, cos, sqrt, atan2
-from typing import Dict
-import uuid
-import base64
-import jwt
-from OpenSSL import crypto
 from datetime import datetime, timezone
 import psycopg2.pool
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer, HTTPAuthorizationCredentials, HTTPBearer
 from starlette.responses import JSONResponse
-from app.auth.Tokenization import Tokenization
 from app.auth.authentication import token_access
 from app.config.config import settings
 
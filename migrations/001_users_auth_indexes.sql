@@ -0,0 +1,12 @@
+-- Indexes for the login and email lookups of the authentication endpoints.
+-- CONCURRENTLY cannot run inside of a transaction, run the statements one by one:
+--   psql -d <server database> -f migrations/001_users_auth_indexes.sql
+
+-- The emails are unique, signup (ON CONFLICT) and edit_profile rely on the index,
+-- it decides about the duplicate email also for concurrent requests.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_auth_email_idx
+    ON users_auth (email);
+
+-- The usernames are not unique, the index only speeds up the login.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_auth_username_idx
+    ON users_auth (username);
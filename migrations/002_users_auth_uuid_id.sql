@@ -0,0 +1,7 @@
+-- Stores the user ids as native uuid (16 bytes) instead of 36 characters of text,
+-- the ids are generated by uuid.uuid4() in signup, so all of them can be converted.
+-- The application keeps passing and reading the ids as text, Postgres casts them.
+--   psql -d <server database> -f migrations/002_users_auth_uuid_id.sql
+
+ALTER TABLE users_auth
+    ALTER COLUMN id TYPE uuid USING id::uuid;
@@ -0,0 +1,19 @@
+-- Stores the latitude and longitude of the places as numbers, they are parsed
+-- from the gps text once when the row is written, not on every radius search.
+-- The gps column stays as it is, the application keeps writing and returning it.
+--   psql -d <client database> -f migrations/004_places_lat_lon.sql
+
+-- The gps text is parsed only when it is "latitude, longitude", for any other text
+-- the columns are NULL, so a malformed gps never fails the write of the place
+-- (add_my_place, edit_my_place, update_databse) or this migration.
+ALTER TABLE places
+    ADD COLUMN lat double precision
+        GENERATED ALWAYS AS (CASE WHEN gps ~ '^-?[0-9]{1,3}(\.[0-9]{1,30})?, -?[0-9]{1,3}(\.[0-9]{1,30})?$'
+                                  THEN split_part(gps, ', ', 1)::float8 END) STORED,
+    ADD COLUMN lon double precision
+        GENERATED ALWAYS AS (CASE WHEN gps ~ '^-?[0-9]{1,3}(\.[0-9]{1,30})?, -?[0-9]{1,3}(\.[0-9]{1,30})?$'
+                                  THEN split_part(gps, ', ', 2)::float8 END) STORED;
+
+-- The radius search filters by the latitude range first.
+CREATE INDEX IF NOT EXISTS places_lat_idx
+    ON places (lat);
@@ -0,0 +1,18 @@
+-- add_favourite inserts with ON CONFLICT (id), which needs a unique index on
+-- favourites.id. The primary key is added only if the table does not have one yet.
+--   psql -d <client database> -f migrations/005_favourites_id_key.sql
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = 'favourites'::regclass
+          AND i.indisunique
+          AND i.indnkeyatts = 1
+          AND a.attname = 'id'
+    ) THEN
+        ALTER TABLE favourites ADD PRIMARY KEY (id);
+    END IF;
+END $$;
@@ -0,0 +1,37 @@
+-- Keys and indexes for the point lookups of the client endpoints.
+-- CONCURRENTLY cannot run inside of a transaction, run the statements one by one:
+--   psql -d <client database> -f migrations/006_client_keys_and_indexes.sql
+
+-- notes, my_places and places are looked up by id (add_edit_note, edit_my_place
+-- and update_databse also rely on the key with ON CONFLICT), the primary key is added
+-- only to the tables which do not have a unique index on id yet. The rows without id
+-- cannot be found by any endpoint and of the rows with the same id only the first
+-- one is kept, so that the primary key can be built.
+DO $$
+DECLARE
+    table_name text;
+BEGIN
+    FOREACH table_name IN ARRAY ARRAY['notes', 'my_places', 'places'] LOOP
+        IF NOT EXISTS (
+            SELECT 1
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+            WHERE i.indrelid = table_name::regclass
+              AND i.indisunique
+              AND i.indnkeyatts = 1
+              AND a.attname = 'id'
+        ) THEN
+            EXECUTE format('DELETE FROM %I WHERE id IS NULL', table_name);
+            EXECUTE format('DELETE FROM %1$I a USING %1$I b WHERE a.id = b.id AND a.ctid > b.ctid', table_name);
+            EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id)', table_name);
+        END IF;
+    END LOOP;
+END $$;
+
+-- upload_image updates the places by name.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS places_name_idx
+    ON places (name);
+
+ANALYZE notes;
+ANALYZE my_places;
+ANALYZE places;